@@ -0,0 +1,25 @@
+#!/usr/bin/env python3
+"""
+Directory Listing - os.scandir helper shared by the tools that walk directories
+"""
+
+import os
+import logging
+from typing import List, Union
+from pathlib import Path
+
+logger = logging.getLogger(__name__)
+
+
+def list_dir(dir_path: Union[str, Path]) -> List[os.DirEntry]:
+    """Return the entries of a directory, or an empty list if it cannot be read
+    
+    The listing is read completely before returning, so callers may rename
+    entries while iterating without the directory stream returning them twice.
+    """
+    try:
+        with os.scandir(dir_path) as it:
+            return list(it)
+    except OSError as e:
+        logger.error(f"Error scanning {dir_path}: {e}")
+        return []
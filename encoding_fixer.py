@@ -4,11 +4,167 @@ Encoding Fixer - Scan and fix filename and content encoding issues
 """
 
 import os
+import logging
+import re
 import sys
-import chardet
+import threading
 import codecs
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from pathlib import Path
-from typing import List, Tuple, Optional
+from typing import Iterator, List, Tuple, Optional
+
+from dir_listing import list_dir
+from log_config import configure_logging
+from thread_pool import MAX_WORKERS
+
+logger = logging.getLogger(__name__)
+
+# Use the fastest installed encoding detector; chardet is the pure-Python fallback.
+# _library_detect is None when chardetng-py is used, which has a streaming API instead.
+try:
+    from cchardet import detect as _library_detect
+except ImportError:
+    try:
+        from chardetng_py import EncodingDetector as _ChardetngDetector
+        _library_detect = None
+    except ImportError:
+        from chardet import detect as _library_detect
+
+# ftfy recognises far more mojibake than the table below, use it when installed
+try:
+    import ftfy
+except ImportError:
+    ftfy = None
+
+# Number of bytes read from the start of a file for encoding detection
+DETECTION_SAMPLE_SIZE = 64 * 1024
+
+# Detected encodings whose content is already valid UTF-8
+UTF8_COMPATIBLE_ENCODINGS = {'ascii', 'utf-8', 'utf-8-sig'}
+
+# Number of bytes checked for non-text characters when sniffing binary files
+BINARY_SNIFF_SIZE = 8192
+
+# Bytes that occur in text files; any other byte marks a file as binary, as in file(1)
+TEXT_CHARS = bytes({7, 8, 9, 10, 12, 13, 27} | set(range(0x20, 0x7F)) | set(range(0x80, 0x100)))
+
+# Bytes that may continue a multibyte character in UTF-8, GBK, Big5 or Shift_JIS
+_POSSIBLE_TRAIL_BYTES = bytes(range(0x40, 0x100))
+
+# Bytes that continue a UTF-8 sequence but can never start one
+_UTF8_CONTINUATION_BYTES = bytes(range(0x80, 0xC0))
+
+# Number of trailing bytes decoded to tell an incomplete UTF-8 sequence from other text
+_UTF8_CHECK_SIZE = 16
+
+# UTF-16/32 text contains NUL bytes, so a leading BOM marks a file as text.
+# UTF-32 comes first because the UTF-32-LE BOM starts with the UTF-16-LE one.
+_UTF16_32_BOMS = {
+    codecs.BOM_UTF32_LE: 'utf-32',
+    codecs.BOM_UTF32_BE: 'utf-32',
+    codecs.BOM_UTF16_LE: 'utf-16',
+    codecs.BOM_UTF16_BE: 'utf-16',
+}
+
+# Common mojibake patterns and their fixes
+_MOJIBAKE_FIXES = {
+    'æ–‡ä»¶': '文件',  # Common mojibake for Chinese characters
+    'Ã©': 'é',  # Common mojibake for é
+    'Ã¨': 'è',  # Common mojibake for è
+    'Ã ': 'à',  # Common mojibake for à
+    'Ã±': 'ñ',  # Common mojibake for ñ
+    'Ã¤': 'ä',  # Common mojibake for ä
+    'Ã¶': 'ö',  # Common mojibake for ö
+    'Ã¼': 'ü',  # Common mojibake for ü
+}
+
+# All patterns are multi-character, so they are matched in a single pass
+# with one alternation; longest first so overlapping patterns resolve the same way
+_MOJIBAKE_RE = re.compile('|'.join(
+    re.escape(mojibake) for mojibake in sorted(_MOJIBAKE_FIXES, key=len, reverse=True)
+))
+
+
+def _replace_mojibake_match(match: re.Match) -> str:
+    """Look up the fix for a matched mojibake pattern"""
+    return _MOJIBAKE_FIXES[match.group(0)]
+
+
+# Encodings tried on the raw bytes of a name when the mojibake fixes do not apply
+_FALLBACK_ENCODINGS = ('latin1', 'cp1252', 'gbk', 'gb2312', 'big5')
+
+
+def _candidate_names(filename: str) -> Iterator[str]:
+    """Yield possible fixed names for a filename, most likely first"""
+    # Try direct mojibake fixes first
+    new_filename = ftfy.fix_encoding(filename) if ftfy is not None else filename
+    new_filename = _MOJIBAKE_RE.sub(_replace_mojibake_match, new_filename)
+    if new_filename != filename:
+        yield new_filename
+    
+    # Try different encodings for more complex cases; only names that
+    # become fully ASCII count as fixed
+    try:
+        raw_bytes = filename.encode('latin1')
+    except UnicodeEncodeError:
+        return
+    
+    for encoding in _FALLBACK_ENCODINGS:
+        decoded_name = raw_bytes.decode(encoding, errors='ignore')
+        if decoded_name.isascii():
+            yield decoded_name
+
+
+def _trim_partial_character(sample: bytes) -> bytes:
+    """Cut a sample that may end mid-character back to a character boundary"""
+    # Bytes below 0x40 (whitespace, digits, most ASCII punctuation) end a character in
+    # every ASCII-compatible encoding, as the trail bytes of GBK, Big5 and Shift_JIS
+    # are never that low
+    trimmed = sample.rstrip(_POSSIBLE_TRAIL_BYTES)
+    if len(trimmed) >= len(sample) // 2:
+        return trimmed
+    
+    # Otherwise drop the end only if it is really an incomplete UTF-8 sequence, which
+    # the incremental decoder holds back. The bytes before it must decode as well, as
+    # a GBK or Big5 character can end in what looks like a UTF-8 lead byte.
+    tail = sample[-_UTF8_CHECK_SIZE:].lstrip(_UTF8_CONTINUATION_BYTES)
+    decoder = codecs.getincrementaldecoder('utf-8')()
+    try:
+        decoder.decode(tail)
+    except UnicodeDecodeError:
+        return sample
+    pending = decoder.getstate()[0]
+    return sample[:-len(pending)] if pending else sample
+
+
+def _detect(raw_data: bytes, last: bool = True) -> dict:
+    """Return a chardet-style {'encoding': ..., 'confidence': ...} dict for raw_data
+    
+    last=False marks raw_data as a prefix of a longer file, which may end mid-character.
+    """
+    if _library_detect is None:
+        # chardetng-py only reports UTF-8 when allowed to
+        detector = _ChardetngDetector()
+        detector.feed(raw_data, last=last)
+        return {'encoding': detector.guess(tld=None, allow_utf8=True), 'confidence': None}
+    
+    # Other detectors take a character cut at the end as invalid data
+    return _library_detect(raw_data if last else _trim_partial_character(raw_data))
+
+
+def _iter_entries(root: str) -> Iterator[os.DirEntry]:
+    """Yield non-directory entries below root using os.scandir
+    
+    Each directory is listed completely before its entries are yielded, so
+    renaming them during iteration never makes the listing repeat an entry.
+    """
+    stack = [root]
+    while stack:
+        for entry in list_dir(stack.pop()):
+            if entry.is_dir(follow_symlinks=False):
+                stack.append(entry.path)
+            elif not entry.is_dir():
+                yield entry
 
 
 class EncodingFixer:
@@ -16,28 +172,42 @@ class EncodingFixer:
         self.root_path = Path(root_path).resolve()
         self.problematic_files: List[Tuple[str, str]] = []  # (old_path, new_path)
         self.encoding_issues: List[Tuple[str, str, str]] = []  # (file_path, old_encoding, new_encoding)
+        self._lock = threading.Lock()
         
-    def detect_encoding(self, file_path: Path) -> Optional[str]:
-        """Detect file encoding using chardet"""
+    def detect_encoding(self, file_path: Path, raw_data: Optional[bytes] = None) -> Optional[str]:
+        """Detect file encoding using the fastest available detector
+        
+        raw_data is an already read sample from the start of the file; if not
+        given, the sample is read from file_path.
+        """
         try:
-            with open(file_path, 'rb') as f:
-                raw_data = f.read()
-                if not raw_data:
-                    return None
-                    
-                result = chardet.detect(raw_data)
-                return result.get('encoding')
+            if raw_data is None:
+                with open(file_path, 'rb') as f:
+                    raw_data = f.read(DETECTION_SAMPLE_SIZE)
+            if not raw_data:
+                return None
+            
+            # Not every detector recognises UTF-16/32, so check the BOM first
+            for bom, encoding in _UTF16_32_BOMS.items():
+                if raw_data.startswith(bom):
+                    return encoding
+            
+            # A full sample is usually cut from a longer file
+            result = _detect(raw_data, last=len(raw_data) < DETECTION_SAMPLE_SIZE)
+            return result.get('encoding')
         except Exception as e:
-            print(f"Error detecting encoding for {file_path}: {e}")
+            logger.error(f"Error detecting encoding for {file_path}: {e}")
             return None
     
+    def is_binary_data(self, sample: bytes) -> bool:
+        """Check if a sample from the start of a file looks like binary data"""
+        if sample.startswith(tuple(_UTF16_32_BOMS)):
+            return False
+        return bool(sample[:BINARY_SNIFF_SIZE].translate(None, TEXT_CHARS))
+    
     def is_filename_valid(self, filename: str) -> bool:
         """Check if filename contains only valid characters"""
-        try:
-            filename.encode('ascii')
-            return True
-        except UnicodeEncodeError:
-            return False
+        return filename.isascii()
     
     def fix_filename_encoding(self, file_path: Path) -> Optional[Path]:
         """Try to fix filename encoding issues"""
@@ -47,72 +217,27 @@ class EncodingFixer:
         if self.is_filename_valid(filename):
             return None
         
-        print(f"Attempting to fix filename: {filename}")
-        
-        # Common mojibake patterns and their fixes
-        mojibake_fixes = {
-            'æ–‡ä»¶': '文件',  # Common mojibake for Chinese characters
-            'Ã©': 'é',  # Common mojibake for é
-            'Ã¨': 'è',  # Common mojibake for è
-            'Ã ': 'à',  # Common mojibake for à
-            'Ã±': 'ñ',  # Common mojibake for ñ
-            'Ã¤': 'ä',  # Common mojibake for ä
-            'Ã¶': 'ö',  # Common mojibake for ö
-            'Ã¼': 'ü',  # Common mojibake for ü
-        }
-        
-        # Try direct mojibake fixes first
-        new_filename = filename
-        for mojibake, correct in mojibake_fixes.items():
-            new_filename = new_filename.replace(mojibake, correct)
-        
-        # If we made changes, try to rename
-        if new_filename != filename:
-            new_path = file_path.parent / new_filename
-            if not new_path.exists():
-                try:
-                    file_path.rename(new_path)
-                    self.problematic_files.append((str(file_path), str(new_path)))
-                    print(f"Fixed filename: {filename} -> {new_filename}")
-                    return new_path
-                except Exception as e:
-                    print(f"Error renaming {filename}: {e}")
-                    return None
-        
-        # Try different encoding combinations for more complex cases
-        encodings_to_try = [
-            ('latin1', 'utf-8'),
-            ('cp1252', 'utf-8'),
-            ('gbk', 'utf-8'),
-            ('gb2312', 'utf-8'),
-            ('big5', 'utf-8'),
-        ]
-        
-        for from_enc, to_enc in encodings_to_try:
+        logger.debug(f"Attempting to fix filename: {filename}")
+        
+        # Rename with plain strings; a Path is only built for the returned result
+        old_path = str(file_path)
+        parent = os.path.dirname(old_path)
+        
+        # Try candidates in order and stop at the first one that can be used
+        for new_filename in _candidate_names(filename):
+            new_path = os.path.join(parent, new_filename)
+            if not new_filename or os.path.exists(new_path):
+                continue
+            
             try:
-                # Try to decode from one encoding and re-encode to UTF-8
-                decoded_bytes = filename.encode('latin1')  # First get raw bytes
-                decoded_name = decoded_bytes.decode(from_enc, errors='ignore')
-                
-                # Create new path
-                new_path = file_path.parent / decoded_name
-                
-                # Check if new filename is valid and doesn't already exist
-                if decoded_name and self.is_filename_valid(decoded_name) and not new_path.exists():
-                    try:
-                        file_path.rename(new_path)
-                        self.problematic_files.append((str(file_path), str(new_path)))
-                        print(f"Fixed filename: {filename} -> {decoded_name}")
-                        return new_path
-                    except Exception as e:
-                        print(f"Error renaming {filename}: {e}")
-                        continue
-                        
+                os.rename(old_path, new_path)
+                self.problematic_files.append((old_path, new_path))
+                logger.info(f"Fixed filename: {filename} -> {new_filename}")
+                return Path(new_path)
             except Exception as e:
-                print(f"Failed encoding conversion {from_enc}->UTF-8 for {filename}: {e}")
-                continue
+                logger.error(f"Error renaming {filename}: {e}")
         
-        print(f"Could not fix filename: {filename}")
+        logger.warning(f"Could not fix filename: {filename}")
         return None
     
     def fix_file_content_encoding(self, file_path: Path) -> bool:
@@ -120,77 +245,117 @@ class EncodingFixer:
         if not file_path.is_file():
             return False
             
-        # Skip binary files
+        # Read one sample for both the binary check and encoding detection
         try:
             with open(file_path, 'rb') as f:
-                sample = f.read(1024)
-                if b'\0' in sample:
-                    return False  # Binary file
+                sample = f.read(DETECTION_SAMPLE_SIZE)
         except:
             return False
         
+        # Skip binary files
+        if self.is_binary_data(sample):
+            return False
+        
         # Detect current encoding
-        detected_encoding = self.detect_encoding(file_path)
-        if not detected_encoding or detected_encoding.lower() == 'utf-8':
+        detected_encoding = self.detect_encoding(file_path, sample)
+        if not detected_encoding or detected_encoding.lower() in UTF8_COMPATIBLE_ENCODINGS:
             return False
         
         try:
-            # Read file with detected encoding
-            with open(file_path, 'r', encoding=detected_encoding, errors='ignore') as f:
-                content = f.read()
+            # The sample already holds the whole file if it is shorter than the limit
+            if len(sample) < DETECTION_SAMPLE_SIZE:
+                raw_data = sample
+            else:
+                with open(file_path, 'rb') as f:
+                    raw_data = f.read()
+            
+            # Pure ASCII content is already valid UTF-8
+            if raw_data.isascii():
+                return False
+            
+            # Never trust the detector over content that decodes as UTF-8
+            try:
+                raw_data.decode('utf-8')
+                return False
+            except UnicodeDecodeError:
+                pass
+            
+            # Convert from detected encoding to UTF-8, skip if nothing changes
+            converted = raw_data.decode(detected_encoding, errors='ignore').encode('utf-8')
+            if converted == raw_data:
+                return False
             
-            # Write back as UTF-8
-            with open(file_path, 'w', encoding='utf-8') as f:
-                f.write(content)
+            with open(file_path, 'wb') as f:
+                f.write(converted)
             
-            self.encoding_issues.append((str(file_path), detected_encoding, 'utf-8'))
-            print(f"Fixed content encoding: {file_path.name} ({detected_encoding} -> UTF-8)")
+            with self._lock:
+                self.encoding_issues.append((str(file_path), detected_encoding, 'utf-8'))
+            logger.info(f"Fixed content encoding: {file_path.name} ({detected_encoding} -> UTF-8)")
             return True
             
         except Exception as e:
-            print(f"Error fixing content encoding for {file_path}: {e}")
+            logger.error(f"Error fixing content encoding for {file_path}: {e}")
             return False
     
     def scan_directory(self, target_path: Optional[str] = None):
         """Scan directory for encoding issues"""
         scan_path = Path(target_path) if target_path else self.root_path
         
-        print(f"Scanning directory: {scan_path}")
-        print("-" * 50)
-        
-        for root, dirs, files in os.walk(scan_path):
-            for filename in files:
-                file_path = Path(root) / filename
-                
-                # Check filename encoding
-                if not self.is_filename_valid(filename):
-                    print(f"Found problematic filename: {file_path}")
-                    self.fix_filename_encoding(file_path)
-                
-                # Fix content encoding for txt files
-                if file_path.suffix.lower() == '.txt':
-                    self.fix_file_content_encoding(file_path)
-        
-        print("\n" + "=" * 50)
-        print("Scan completed!")
+        logger.info(f"Scanning directory: {scan_path}")
+        logger.info("-" * 50)
+        
+        txt_files: List[Path] = []
+        
+        for entry in _iter_entries(str(scan_path)):
+            filename = entry.name
+            file_path = None
+            
+            # Check filename encoding
+            if not self.is_filename_valid(filename):
+                file_path = Path(entry.path)
+                logger.debug(f"Found problematic filename: {file_path}")
+                file_path = self.fix_filename_encoding(file_path) or file_path
+                filename = file_path.name
+            
+            # Collect txt files for content encoding fixes
+            if filename.lower().endswith('.txt'):
+                txt_files.append(file_path or Path(entry.path))
+        
+        # Fix content encoding for txt files in parallel
+        with ThreadPoolExecutor(max_workers=MAX_WORKERS) as executor:
+            futures = [executor.submit(self.fix_file_content_encoding, path) for path in txt_files]
+            for future in as_completed(futures):
+                future.result()
+        
+        logger.info("\n" + "=" * 50)
+        logger.info("Scan completed!")
         
         if self.problematic_files:
-            print(f"\nFixed {len(self.problematic_files)} filename encoding issues:")
+            logger.info(f"\nFixed {len(self.problematic_files)} filename encoding issues:")
             for old, new in self.problematic_files:
-                print(f"  {old} -> {new}")
+                logger.info(f"  {old} -> {new}")
         
         if self.encoding_issues:
-            print(f"\nFixed {len(self.encoding_issues)} content encoding issues:")
+            logger.info(f"\nFixed {len(self.encoding_issues)} content encoding issues:")
             for file_path, old_enc, new_enc in self.encoding_issues:
-                print(f"  {file_path}: {old_enc} -> {new_enc}")
+                logger.info(f"  {file_path}: {old_enc} -> {new_enc}")
         
         if not self.problematic_files and not self.encoding_issues:
-            print("No encoding issues found!")
+            logger.info("No encoding issues found!")
 
 
 def main():
-    if len(sys.argv) > 1:
-        target_path = sys.argv[1]
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Encoding Fixer Tool')
+    parser.add_argument('path', nargs='?', help='Directory path to scan (prompted for if omitted)')
+    parser.add_argument('-v', '--verbose', action='store_true', help='Show debug messages')
+
+    args = parser.parse_args()
+    configure_logging(verbose=args.verbose)
+    
+    if args.path:
+        target_path = args.path
     else:
         target_path = input("Enter directory path to scan (default: current directory): ").strip()
         if not target_path:
@@ -4,108 +4,193 @@ File Comparison Tool - Compare txt file contents between chinese_old and chinese
 """
 
 import os
+import logging
+import mmap
 import hashlib
-import filecmp
+from concurrent.futures import ThreadPoolExecutor
+from itertools import repeat
 from pathlib import Path
-from typing import Dict, List, Tuple
+from typing import Dict, List, Tuple, Union
+
+from dir_listing import list_dir
+from log_config import configure_logging
+from thread_pool import MAX_WORKERS
+
+logger = logging.getLogger(__name__)
+
+try:
+    from blake3 import blake3
+except ImportError:
+    blake3 = None
+
+# Files at least this large are memory-mapped for hashing instead of read into memory
+MMAP_THRESHOLD = 1024 * 1024
+
+# Block size for byte comparison; each block is compared with a single memcmp in C
+COMPARE_BLOCK_SIZE = 1024 * 1024
 
 
 class FileComparator:
-    def __init__(self, old_dir: str, new_dir: str):
+    def __init__(self, old_dir: str, new_dir: str, crypto: bool = False):
         self.old_dir = Path(old_dir)
         self.new_dir = Path(new_dir)
+        self.crypto = crypto  # Use MD5 instead of the faster non-cryptographic hash
         self.comparison_results: Dict[str, Dict] = {}
         self.pdf_comparison_results: Dict[str, Dict] = {}
         
+    def _new_hasher(self):
+        """Create a hash object (BLAKE3 if installed, otherwise BLAKE2b; MD5 in crypto mode)"""
+        if self.crypto:
+            return hashlib.md5()
+        if blake3 is not None:
+            return blake3(max_threads=blake3.AUTO)
+        return hashlib.blake2b()
+    
     def get_file_hash(self, file_path: Path) -> str:
-        """Calculate MD5 hash of a file"""
-        hash_md5 = hashlib.md5()
+        """Calculate hash of a file, memory-mapping large files"""
+        hasher = self._new_hasher()
         try:
             with open(file_path, "rb") as f:
-                for chunk in iter(lambda: f.read(4096), b""):
-                    hash_md5.update(chunk)
-            return hash_md5.hexdigest()
+                if os.fstat(f.fileno()).st_size < MMAP_THRESHOLD:
+                    hasher.update(f.read())
+                else:
+                    with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                        hasher.update(mm)
+            return hasher.hexdigest()
         except Exception as e:
-            print(f"Error calculating hash for {file_path}: {e}")
+            logger.error(f"Error calculating hash for {file_path}: {e}")
             return ""
     
-    def get_file_size(self, file_path: Path) -> int:
-        """Get file size in bytes"""
+    def get_file_size(self, file_path: Union[Path, os.DirEntry]) -> int:
+        """Get file size in bytes (a DirEntry reuses its cached stat result)"""
         try:
             return file_path.stat().st_size
         except Exception as e:
-            print(f"Error getting size for {file_path}: {e}")
+            logger.error(f"Error getting size for {file_path}: {e}")
             return 0
     
-    def compare_txt_files(self) -> Dict[str, Dict]:
-        """Compare txt files between the two directories"""
-        print("正在对比txt文件内容...")
-        print("-" * 60)
+    def compare_file_contents(self, old_file: Path, new_file: Path) -> bool:
+        """Compare two files block by block, stopping at the first difference"""
+        try:
+            with open(old_file, "rb") as f_old, open(new_file, "rb") as f_new:
+                while True:
+                    old_block = f_old.read(COMPARE_BLOCK_SIZE)
+                    if old_block != f_new.read(COMPARE_BLOCK_SIZE):
+                        return False
+                    if not old_block:
+                        return True
+        except Exception as e:
+            logger.error(f"Error comparing {old_file} and {new_file}: {e}")
+            return False
+    
+    def _compare_txt_pair(self, result: Dict, compute_hashes: bool) -> Dict:
+        """Fill in the size and content comparison fields of a txt file result"""
+        if not result["exists_in_new"]:
+            return result
+        
+        old_file = Path(result["old_file_path"])
+        new_file = Path(result["new_file_path"])
         
-        # 获取chinese_old目录中的所有txt文件
-        old_txt_files = list(self.old_dir.glob("*.txt"))
+        result["size_match"] = result["old_size"] == result["new_size"]
+        
+        if compute_hashes:
+            result["old_hash"] = self.get_file_hash(old_file)
+            result["new_hash"] = self.get_file_hash(new_file)
+            result["hash_match"] = result["old_hash"] == result["new_hash"]
+        elif result["size_match"]:
+            # 大小不同时内容必然不同, 无需读取文件
+            result["hash_match"] = self.compare_file_contents(old_file, new_file)
+        
+        result["identical"] = result["size_match"] and result["hash_match"]
+        return result
+    
+    def compare_txt_files(self, compute_hashes: bool = False) -> Dict[str, Dict]:
+        """Compare txt files between the two directories
         
-        for old_file in old_txt_files:
-            file_name = old_file.name
-            new_file = self.new_dir / file_name
+        File hashes are only calculated when compute_hashes is set; otherwise
+        files of equal size are compared directly and others are skipped.
+        """
+        logger.info("正在对比txt文件内容...")
+        logger.info("-" * 60)
+        
+        # 获取chinese_old目录中的所有txt文件, 以及chinese目录中的所有文件
+        old_txt_files = [
+            entry for entry in list_dir(self.old_dir)
+            if entry.name.endswith(".txt") and entry.is_file()
+        ]
+        new_entries = {entry.name: entry for entry in list_dir(self.new_dir)}
+        
+        results = []
+        for old_entry in old_txt_files:
+            file_name = old_entry.name
+            new_entry = new_entries.get(file_name)
             
             result = {
                 "file_name": file_name,
-                "old_file_path": str(old_file),
-                "new_file_path": str(new_file) if new_file.exists() else None,
-                "exists_in_new": new_file.exists(),
+                "old_file_path": old_entry.path,
+                "new_file_path": new_entry.path if new_entry is not None else None,
+                "exists_in_new": new_entry is not None,
                 "identical": False,
                 "size_match": False,
                 "hash_match": False,
-                "old_size": self.get_file_size(old_file),
+                "old_size": self.get_file_size(old_entry),
                 "new_size": 0,
                 "old_hash": "",
                 "new_hash": ""
             }
             
-            if new_file.exists():
-                # 计算两个文件的大小和哈希值
-                result["new_size"] = self.get_file_size(new_file)
-                result["old_hash"] = self.get_file_hash(old_file)
-                result["new_hash"] = self.get_file_hash(new_file)
-                
-                # 检查是否完全一致
-                result["size_match"] = result["old_size"] == result["new_size"]
-                result["hash_match"] = result["old_hash"] == result["new_hash"]
-                result["identical"] = result["size_match"] and result["hash_match"]
-            
-            self.comparison_results[file_name] = result
+            if result["exists_in_new"]:
+                result["new_size"] = self.get_file_size(new_entry)
             
-            # 打印结果
-            if not new_file.exists():
-                print(f"❌ {file_name}: 在chinese目录中不存在")
-            elif result["identical"]:
-                print(f"✅ {file_name}: 完全一致")
-            else:
-                differences = []
-                if not result["size_match"]:
-                    differences.append(f"大小不同 ({result['old_size']} vs {result['new_size']} 字节)")
-                if not result["hash_match"]:
-                    differences.append("内容不同")
-                print(f"❌ {file_name}: {', '.join(differences)}")
+            results.append(result)
+        
+        # 并行对比两个目录中的文件内容
+        with ThreadPoolExecutor(max_workers=MAX_WORKERS) as executor:
+            for result in executor.map(self._compare_txt_pair, results, repeat(compute_hashes)):
+                self.comparison_results[result["file_name"]] = result
+                
+                # 打印结果
+                self._print_txt_result(result)
         
         return self.comparison_results
     
+    def _print_txt_result(self, result: Dict):
+        """Print the comparison result of a single txt file"""
+        file_name = result["file_name"]
+        if not result["exists_in_new"]:
+            logger.info(f"❌ {file_name}: 在chinese目录中不存在")
+        elif result["identical"]:
+            logger.info(f"✅ {file_name}: 完全一致")
+        else:
+            differences = []
+            if not result["size_match"]:
+                differences.append(f"大小不同 ({result['old_size']} vs {result['new_size']} 字节)")
+            if not result["hash_match"]:
+                differences.append("内容不同")
+            logger.info(f"❌ {file_name}: {', '.join(differences)}")
+    
+    def _find_ghost_pit_pdfs(self, directory: Path) -> List[os.DirEntry]:
+        """Find 鬼穴 PDF files in a directory"""
+        return [
+            entry for entry in list_dir(directory)
+            if "鬼穴" in entry.name and entry.name.lower().endswith(".pdf") and entry.is_file()
+        ]
+    
     def compare_pdf_files(self) -> Dict[str, Dict]:
         """Compare PDF files (specifically 鬼穴 files) by size"""
-        print("\n正在对比PDF文件大小...")
-        print("-" * 60)
+        logger.info("\n正在对比PDF文件大小...")
+        logger.info("-" * 60)
         
         # 查找鬼穴PDF文件
-        old_ghost_pit = list(self.old_dir.glob("*鬼穴*.pdf"))
-        new_ghost_pit = list(self.new_dir.glob("*鬼穴*.pdf"))
+        old_ghost_pit = self._find_ghost_pit_pdfs(self.old_dir)
+        new_ghost_pit = self._find_ghost_pit_pdfs(self.new_dir)
         
         if not old_ghost_pit:
-            print("❌ chinese_old目录中未找到鬼穴PDF文件")
+            logger.info("❌ chinese_old目录中未找到鬼穴PDF文件")
             return {}
         
         if not new_ghost_pit:
-            print("❌ chinese目录中未找到鬼穴PDF文件")
+            logger.info("❌ chinese目录中未找到鬼穴PDF文件")
             return {}
         
         old_file = old_ghost_pit[0]
@@ -115,8 +200,8 @@ class FileComparator:
         new_size = self.get_file_size(new_file)
         
         result = {
-            "old_file": str(old_file),
-            "new_file": str(new_file),
+            "old_file": old_file.path,
+            "new_file": new_file.path,
             "old_size": old_size,
             "new_size": new_size,
             "size_match": old_size == new_size,
@@ -126,9 +211,9 @@ class FileComparator:
         self.pdf_comparison_results["鬼穴.pdf"] = result
         
         if result["size_match"]:
-            print(f"✅ 鬼穴PDF文件: 大小完全一致 ({old_size} 字节)")
+            logger.info(f"✅ 鬼穴PDF文件: 大小完全一致 ({old_size} 字节)")
         else:
-            print(f"❌ 鬼穴PDF文件: 大小不同 (chinese_old: {old_size} 字节, chinese: {new_size} 字节, 差异: {result['size_difference']} 字节)")
+            logger.info(f"❌ 鬼穴PDF文件: 大小不同 (chinese_old: {old_size} 字节, chinese: {new_size} 字节, 差异: {result['size_difference']} 字节)")
         
         return self.pdf_comparison_results
     
@@ -160,7 +245,10 @@ class FileComparator:
             report.append("\n内容不同的文件:")
             for file_name, result in self.comparison_results.items():
                 if result["exists_in_new"] and not result["identical"]:
-                    report.append(f"  - {file_name}")
+                    if result["old_hash"]:
+                        report.append(f"  - {file_name} ({result['old_hash']} vs {result['new_hash']})")
+                    else:
+                        report.append(f"  - {file_name}")
         
         # PDF文件对比总结
         if self.pdf_comparison_results:
@@ -173,26 +261,36 @@ class FileComparator:
         
         return "\n".join(report)
     
-    def run_comparison(self):
-        """运行完整的对比流程"""
-        print("开始对比chinese_old和chinese目录中的文件...")
-        print("=" * 60)
+    def run_comparison(self, compute_hashes: bool = False):
+        """运行完整的对比流程, compute_hashes为True时计算并报告文件哈希值"""
+        logger.info("开始对比chinese_old和chinese目录中的文件...")
+        logger.info("=" * 60)
         
         # 对比txt文件
-        self.compare_txt_files()
+        self.compare_txt_files(compute_hashes=compute_hashes)
         
         # 对比PDF文件
         self.compare_pdf_files()
         
         # 生成并打印报告
-        print("\n" + "=" * 60)
+        logger.info("\n" + "=" * 60)
         report = self.generate_summary_report()
-        print(report)
+        logger.info(report)
         
         return report
 
 
 def main():
+    import argparse
+
+    parser = argparse.ArgumentParser(description='File Comparison Tool')
+    parser.add_argument('--hashes', action='store_true', help='Calculate file hashes and include them in the report')
+    parser.add_argument('--crypto', action='store_true', help='Use MD5 instead of BLAKE3/BLAKE2b for file hashes (implies --hashes)')
+    parser.add_argument('-v', '--verbose', action='store_true', help='Show debug messages')
+
+    args = parser.parse_args()
+    configure_logging(verbose=args.verbose)
+
     # 设置目录路径
     chinese_old_dir = "/app/Xeelee_Sequence/chinese_old"
     chinese_dir = "/app/Xeelee_Sequence/chinese"
@@ -207,8 +305,8 @@ def main():
         return
     
     # 创建对比器并运行对比
-    comparator = FileComparator(chinese_old_dir, chinese_dir)
-    comparator.run_comparison()
+    comparator = FileComparator(chinese_old_dir, chinese_dir, crypto=args.crypto)
+    comparator.run_comparison(compute_hashes=args.hashes or args.crypto)
 
 
 if __name__ == "__main__":
@@ -4,10 +4,41 @@ Unicode Filename Fixer - Special tool for fixing Unicode escape sequences in fil
 """
 
 import os
+import logging
 import re
 import sys
 from pathlib import Path
-from typing import List, Tuple, Optional
+from typing import Iterator, List, Tuple, Optional
+
+from dir_listing import list_dir
+from log_config import configure_logging
+
+logger = logging.getLogger(__name__)
+
+# Pattern to match #U followed by 4 hex digits
+_UNICODE_ESC_RE = re.compile(r'#U([0-9a-fA-F]{4})')
+
+
+def _replace_unicode_match(match: re.Match) -> str:
+    """Convert the hex code of a #UXXXX match to its Unicode character"""
+    return chr(int(match.group(1), 16))
+
+
+def _iter_entries_post_order(root: str) -> Iterator[Tuple[os.DirEntry, bool]]:
+    """Yield (entry, is_dir) below root, with every directory after its contents"""
+    stack = [(None, list_dir(root))]
+    while stack:
+        dir_entry, entries = stack[-1]
+        if entries:
+            entry = entries.pop()
+            if entry.is_dir(follow_symlinks=False):
+                stack.append((entry, list_dir(entry.path)))
+            else:
+                yield entry, entry.is_dir()
+        else:
+            stack.pop()
+            if dir_entry is not None:
+                yield dir_entry, True
 
 
 class UnicodeFilenameFixer:
@@ -17,103 +48,86 @@ class UnicodeFilenameFixer:
         
     def decode_unicode_escape(self, filename: str) -> str:
         """Decode Unicode escape sequences like #U51b2#U950b#U7ebf to actual Chinese characters"""
-        # Pattern to match #U followed by 4 hex digits
-        pattern = r'#U([0-9a-fA-F]{4})'
-        
-        def replace_unicode_match(match):
-            hex_code = match.group(1)
-            try:
-                # Convert hex to integer, then to Unicode character
-                unicode_char = chr(int(hex_code, 16))
-                return unicode_char
-            except ValueError:
-                return match.group(0)  # Return original if conversion fails
-        
-        # Replace all Unicode escape sequences
-        decoded_name = re.sub(pattern, replace_unicode_match, filename)
-        return decoded_name
+        return _UNICODE_ESC_RE.sub(_replace_unicode_match, filename)
     
-    def fix_pathname(self, path: Path) -> bool:
-        """Fix Unicode escape sequences in a single file or directory name"""
-        original_name = path.name
-
-        # Check if name contains Unicode escape sequences
-        if not re.search(r'#U[0-9a-fA-F]{4}', original_name):
-            return False
-
-        # Decode the Unicode escape sequences
-        new_name = self.decode_unicode_escape(original_name)
-
-        # Skip if no change was made
-        if new_name == original_name:
-            return False
+    def _rename(self, path: str, new_name: str, is_dir: bool) -> bool:
+        """Rename a file or directory to its already decoded name"""
+        item_type = "directory" if is_dir else "filename"
+        original_name = os.path.basename(path)
 
         # Create new path
-        new_path = path.parent / new_name
+        new_path = os.path.join(os.path.dirname(path), new_name)
 
         # Check if new name already exists
-        if new_path.exists():
-            print(f"Warning: Target name already exists: {new_name}")
+        if os.path.exists(new_path):
+            logger.warning(f"Target name already exists: {new_name}")
             return False
 
         try:
             # Rename the file or directory
-            path.rename(new_path)
-            self.fixed_files.append((str(path), str(new_path)))
-            item_type = "directory" if path.is_dir() else "filename"
-            print(f"Fixed {item_type}: {original_name} -> {new_name}")
+            os.rename(path, new_path)
+            self.fixed_files.append((path, new_path))
+            logger.info(f"Fixed {item_type}: {original_name} -> {new_name}")
             return True
         except Exception as e:
-            item_type = "directory" if path.is_dir() else "filename"
-            print(f"Error renaming {item_type} {original_name}: {e}")
+            logger.error(f"Error renaming {item_type} {original_name}: {e}")
             return False
 
+    def fix_pathname(self, path: Path) -> Tuple[bool, str]:
+        """Fix Unicode escape sequences in a single file or directory name
+        
+        Returns whether the item was renamed, and its decoded name.
+        """
+        original_name = path.name
+
+        # Decode the Unicode escape sequences, skip if the name has none
+        new_name = self.decode_unicode_escape(original_name)
+        if new_name == original_name:
+            return False, new_name
+
+        return self._rename(str(path), new_name, path.is_dir()), new_name
+
     def fix_filename(self, file_path: Path) -> bool:
         """Fix Unicode escape sequences in a single filename (backward compatibility)"""
-        return self.fix_pathname(file_path)
+        return self.fix_pathname(file_path)[0]
     
     def scan_and_fix_directory(self, target_path: Optional[str] = None, fix_folders: bool = True):
         """Scan directory and fix Unicode escape sequences in filenames and optionally folder names"""
         scan_path = Path(target_path) if target_path else self.root_path
 
-        print(f"Scanning directory for Unicode escape sequences: {scan_path}")
-        print("-" * 60)
+        logger.info(f"Scanning directory for Unicode escape sequences: {scan_path}")
+        logger.info("-" * 60)
 
         items_processed = 0
         items_fixed = 0
 
-        for root, dirs, files in os.walk(scan_path):
-
-            # Process directories if enabled
-            if fix_folders:
-                for dirname in dirs[:]:
-                    dir_path = Path(root) / dirname
-                    items_processed += 1
+        # Children are visited before their parent directory, so renaming a
+        # directory never invalidates a path that is still to be processed
+        for entry, is_dir in _iter_entries_post_order(str(scan_path)):
+            if is_dir and not fix_folders:
+                continue
 
-                    if self.fix_pathname(dir_path):
-                        items_fixed += 1
-                        # Update dirs list to reflect the new name for further traversal
-                        dirs[dirs.index(dirname)] = self.decode_unicode_escape(dirname)
+            items_processed += 1
 
-            # Process files
-            for filename in files:
-                file_path = Path(root) / filename
-                items_processed += 1
+            # Decode each name once and rename using the entry's path string
+            new_name = self.decode_unicode_escape(entry.name)
+            if new_name == entry.name:
+                continue
 
-                if self.fix_pathname(file_path):
-                    items_fixed += 1
+            if self._rename(entry.path, new_name, is_dir):
+                items_fixed += 1
 
-        print("\n" + "=" * 60)
-        print(f"Scan completed!")
-        print(f"Items processed: {items_processed}")
-        print(f"Items with Unicode escape sequences fixed: {items_fixed}")
+        logger.info("\n" + "=" * 60)
+        logger.info(f"Scan completed!")
+        logger.info(f"Items processed: {items_processed}")
+        logger.info(f"Items with Unicode escape sequences fixed: {items_fixed}")
 
         if self.fixed_files:
-            print(f"\nFixed items:")
+            logger.info(f"\nFixed items:")
             for old_path, new_path in self.fixed_files:
-                print(f"  {old_path} -> {new_path}")
+                logger.info(f"  {old_path} -> {new_path}")
         else:
-            print("No Unicode escape sequences found in filenames or folder names.")
+            logger.info("No Unicode escape sequences found in filenames or folder names.")
 
 
 def main():
@@ -122,8 +136,10 @@ def main():
     parser = argparse.ArgumentParser(description='Unicode Filename and Folder Fixer Tool')
     parser.add_argument('path', nargs='?', default='.', help='Directory path to scan (default: current directory)')
     parser.add_argument('--no-folders', action='store_true', help='Only fix filenames, skip folder names')
+    parser.add_argument('-v', '--verbose', action='store_true', help='Show debug messages')
 
     args = parser.parse_args()
+    configure_logging(verbose=args.verbose)
 
     target_path = args.path
     fix_folders = not args.no_folders
@@ -0,0 +1,27 @@
+#!/usr/bin/env python3
+"""
+Logging Config - Buffered console logging shared by the command line tools
+"""
+
+import logging
+import logging.handlers
+import sys
+
+# Number of log records kept in memory before they are written to the console
+BUFFER_CAPACITY = 1024
+
+
+def configure_logging(verbose: bool = False):
+    """Log plain messages to stdout, buffering records to avoid a write per scanned file"""
+    console_handler = logging.StreamHandler(sys.stdout)
+    console_handler.setFormatter(logging.Formatter("%(message)s"))
+
+    # Errors flush the buffer immediately; everything else is flushed when the
+    # buffer is full or at interpreter exit via logging.shutdown
+    buffer_handler = logging.handlers.MemoryHandler(
+        BUFFER_CAPACITY, flushLevel=logging.ERROR, target=console_handler
+    )
+
+    root_logger = logging.getLogger()
+    root_logger.addHandler(buffer_handler)
+    root_logger.setLevel(logging.DEBUG if verbose else logging.INFO)
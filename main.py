@@ -6,16 +6,26 @@ Encoding Fixer - Main entry point
 import sys
 import os
 from encoding_fixer import EncodingFixer
+from log_config import configure_logging
 
 
 def main():
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Encoding Fixer Tool')
+    parser.add_argument('path', nargs='?', help='Directory path to scan (prompted for if omitted)')
+    parser.add_argument('-v', '--verbose', action='store_true', help='Show debug messages')
+
+    args = parser.parse_args()
+    configure_logging(verbose=args.verbose)
+    
     print("Encoding Fixer Tool")
     print("=" * 30)
     print("This tool scans for and fixes filename and content encoding issues.")
     print()
     
-    if len(sys.argv) > 1:
-        target_path = sys.argv[1]
+    if args.path:
+        target_path = args.path
     else:
         target_path = input("Enter directory path to scan (default: current directory): ").strip()
         if not target_path:
@@ -0,0 +1,135 @@
+#!/usr/bin/env python3
+"""
+Regression tests for EncodingFixer
+"""
+
+import os
+import tempfile
+import unittest
+from pathlib import Path
+from unittest import mock
+
+import chardet
+
+import encoding_fixer
+from encoding_fixer import DETECTION_SAMPLE_SIZE, EncodingFixer, _trim_partial_character
+
+TEXT = '冲锋线测试, 文件夹的中文内容 123。'
+# No byte below 0x40 once encoded, so the sample end cannot be found from ASCII
+TEXT_WITHOUT_ASCII = '第一章　冲锋线，鬼穴的中文内容！'
+
+
+class TruncatedSampleTest(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.temp_dir.cleanup)
+        self.fixer = EncodingFixer(self.temp_dir.name)
+
+    def write_file(self, data: bytes) -> Path:
+        file_path = Path(self.temp_dir.name) / 'large.txt'
+        file_path.write_bytes(data)
+        return file_path
+
+    def make_contents(self, encoding: str, text: str = TEXT, cut_only: bool = True) -> list:
+        """Build contents longer than the sample; with cut_only, only those cut mid-character"""
+        contents = []
+        for shift in range(4):
+            data = ('a' * shift + text * (DETECTION_SAMPLE_SIZE // len(text))).encode(encoding)
+            self.assertGreater(len(data), DETECTION_SAMPLE_SIZE)
+            try:
+                data[:DETECTION_SAMPLE_SIZE].decode(encoding)
+            except UnicodeDecodeError:
+                contents.append(data)
+            else:
+                if not cut_only:
+                    contents.append(data)
+        self.assertTrue(contents)
+        return contents
+
+    def test_utf8_file_cut_mid_character_is_left_alone(self):
+        for data in self.make_contents('utf-8'):
+            with self.subTest(length=len(data)):
+                file_path = self.write_file(data)
+
+                self.assertFalse(self.fixer.fix_file_content_encoding(file_path))
+                self.assertEqual(file_path.read_bytes(), data)
+
+    def test_gbk_file_cut_mid_character_is_converted(self):
+        for data in self.make_contents('gbk'):
+            with self.subTest(length=len(data)):
+                file_path = self.write_file(data)
+
+                self.assertTrue(self.fixer.fix_file_content_encoding(file_path))
+                self.assertEqual(file_path.read_bytes(), data.decode('gbk').encode('utf-8'))
+
+    def test_utf8_file_without_ascii_is_left_alone(self):
+        for data in self.make_contents('utf-8', TEXT_WITHOUT_ASCII, cut_only=False):
+            with self.subTest(length=len(data)):
+                file_path = self.write_file(data)
+
+                self.assertFalse(self.fixer.fix_file_content_encoding(file_path))
+                self.assertEqual(file_path.read_bytes(), data)
+
+    def test_gbk_file_without_ascii_is_converted(self):
+        for data in self.make_contents('gbk', TEXT_WITHOUT_ASCII, cut_only=False):
+            with self.subTest(length=len(data)):
+                file_path = self.write_file(data)
+
+                self.assertTrue(self.fixer.fix_file_content_encoding(file_path))
+                self.assertEqual(file_path.read_bytes(), data.decode('gbk').encode('utf-8'))
+
+
+class TrimPartialCharacterTest(unittest.TestCase):
+    def test_complete_gbk_without_ascii_is_kept(self):
+        for shift in range(len(TEXT_WITHOUT_ASCII)):
+            sample = (TEXT_WITHOUT_ASCII * 100 + TEXT_WITHOUT_ASCII[:shift]).encode('gbk')
+            with self.subTest(shift=shift):
+                self.assertEqual(_trim_partial_character(sample), sample)
+
+    def test_incomplete_utf8_sequence_is_dropped(self):
+        data = (TEXT_WITHOUT_ASCII * 100).encode('utf-8')
+        for cut in (1, 2):
+            with self.subTest(cut=cut):
+                self.assertEqual(_trim_partial_character(data[:-cut]), data[:-3])
+
+
+class ChardetTruncatedSampleTest(TruncatedSampleTest):
+    """Runs the same checks through chardet, which needs the sample trimmed"""
+
+    def setUp(self):
+        super().setUp()
+        patcher = mock.patch.object(encoding_fixer, '_library_detect', chardet.detect)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+
+class Utf8ContentTest(unittest.TestCase):
+    def test_valid_utf8_is_not_rewritten_when_misdetected(self):
+        with tempfile.TemporaryDirectory() as temp_dir:
+            file_path = Path(temp_dir) / 'utf8.txt'
+            data = TEXT.encode('utf-8')
+            file_path.write_bytes(data)
+            fixer = EncodingFixer(temp_dir)
+            fixer.detect_encoding = lambda *args: 'gb18030'
+
+            self.assertFalse(fixer.fix_file_content_encoding(file_path))
+            self.assertEqual(file_path.read_bytes(), data)
+
+
+class ScanDirectoryRenameTest(unittest.TestCase):
+    def test_many_renames_in_one_directory_are_each_fixed_once(self):
+        file_count = 2000
+        with tempfile.TemporaryDirectory() as temp_dir:
+            for i in range(file_count):
+                (Path(temp_dir) / f'f{i:04d}Ã©.txt').write_bytes(b'ascii')
+            fixer = EncodingFixer(temp_dir)
+
+            fixer.scan_directory()
+
+            expected = sorted(f'f{i:04d}é.txt' for i in range(file_count))
+            self.assertEqual(sorted(os.listdir(temp_dir)), expected)
+            self.assertEqual(len(fixer.problematic_files), file_count)
+
+
+if __name__ == '__main__':
+    unittest.main()
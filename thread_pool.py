@@ -0,0 +1,10 @@
+#!/usr/bin/env python3
+"""
+Thread Pool - Worker count shared by the tools that process files in parallel
+"""
+
+import os
+
+# Per-file work (encoding detection, hashing, byte comparison) mostly waits on
+# disk reads, so use more threads than CPUs to keep several reads in flight
+MAX_WORKERS = (os.cpu_count() or 1) * 4